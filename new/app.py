@@ -5,9 +5,8 @@
 
 import streamlit as st
 import pandas as pd
-from utils.file_handler import FileHandler
-from utils.ai_agent import DataAnalysisAgent
-from utils.visualizer import DataVisualizer
+from utils.file_handler import FileHandler, compute_data_hash
+from utils.visualizer import get_visualizer
 
 
 # 页面配置
@@ -55,12 +54,17 @@ def initialize_session_state():
     """初始化会话状态"""
     if 'data' not in st.session_state:
         st.session_state.data = None
-    if 'ai_agent' not in st.session_state:
-        st.session_state.ai_agent = DataAnalysisAgent()
+    if 'data_hash' not in st.session_state:
+        st.session_state.data_hash = None
     if 'file_handler' not in st.session_state:
         st.session_state.file_handler = FileHandler()
-    if 'visualizer' not in st.session_state:
-        st.session_state.visualizer = DataVisualizer()
+
+
+@st.cache_resource
+def get_agent():
+    """获取AI代理单例（首次使用时才导入langchain等依赖）"""
+    from utils.ai_agent import DataAnalysisAgent
+    return DataAnalysisAgent()
 
 
 def main():
@@ -95,6 +99,7 @@ def main():
         st.markdown("---")
         if st.button("使用示例数据"):
             st.session_state.data = st.session_state.file_handler.get_sample_data()
+            st.session_state.data_hash = compute_data_hash(st.session_state.data)
             st.success("示例数据已加载")
             st.rerun()
         
@@ -139,6 +144,7 @@ def show_data_overview():
     with col2:
         if st.button("清除数据"):
             st.session_state.data = None
+            st.session_state.data_hash = None
             st.success("数据已清除")
             st.rerun()
 
@@ -161,6 +167,7 @@ def show_ai_analysis():
     user_question = st.text_area(
         "请输入您的问题：",
         placeholder="例如：各产品的销售额对比如何？",
+        help="每行一个问题，输入多行时将同时提交分析",
         height=100
     )
     
@@ -171,35 +178,57 @@ def show_ai_analysis():
     
     # 处理AI分析
     if analyze_button and user_question.strip():
-        with st.spinner("AI正在分析中..."):
-            try:
-                # 直接传递DataFrame给AI代理
-                result = st.session_state.ai_agent.process_query(
-                    user_question, 
-                    st.session_state.data
-                )
-                
-                if result['success']:
-                    # 显示AI响应
-                    st.markdown("### 分析结果")
-                    st.session_state.visualizer.render_response(result['data'])
-                    
-                    # 显示原始响应（调试用）
-                    with st.expander("调试信息"):
-                        st.json(result)
-                else:
-                    st.error(f"分析失败：{result.get('error', '未知错误')}")
-                    if result.get('raw_response'):
-                        with st.expander("原始响应"):
-                            st.text(result['raw_response'])
-                            
-            except Exception as e:
-                st.error(f"处理过程中出现错误：{str(e)}")
+        questions = [q.strip() for q in user_question.splitlines() if q.strip()]
+        try:
+            agent = get_agent()
+            # 直接传递DataFrame给AI代理
+            if len(questions) == 1:
+                result = agent.get_cached_result(questions[0], st.session_state.data)
+                if result is None:
+                    # 单个问题流式输出，边生成边显示
+                    with st.expander("AI输出", expanded=True):
+                        response_text = st.write_stream(
+                            agent.stream_query(questions[0], st.session_state.data)
+                        )
+                    result = agent.parse_response(response_text.strip(), st.session_state.data)
+                    agent.cache_result(questions[0], st.session_state.data, result)
+                render_analysis_result(result, "### 分析结果")
+            else:
+                # 多个问题批量提交，并发请求模型
+                with st.spinner("AI正在分析中..."):
+                    results = agent.process_queries(
+                        questions,
+                        st.session_state.data
+                    )
+                for i, (question, result) in enumerate(zip(questions, results), 1):
+                    st.markdown(f"### 问题{i}：{question}")
+                    render_analysis_result(result)
+                        
+        except Exception as e:
+            st.error(f"处理过程中出现错误：{str(e)}")
     
     elif analyze_button:
         st.warning("请输入问题内容")
 
 
+def render_analysis_result(result, title=None):
+    """显示单个问题的分析结果"""
+    if result['success']:
+        # 显示AI响应
+        if title:
+            st.markdown(title)
+        get_visualizer().render_response(result['data'])
+        
+        # 显示原始响应（调试用）
+        with st.expander("调试信息"):
+            st.json(result)
+    else:
+        st.error(f"分析失败：{result.get('error', '未知错误')}")
+        if result.get('raw_response'):
+            with st.expander("原始响应"):
+                st.text(result['raw_response'])
+
+
 def show_data_visualization():
     """显示数据可视化页面"""
     st.markdown('<h2 class="sub-header">数据可视化</h2>', unsafe_allow_html=True)
@@ -231,14 +260,14 @@ def show_data_visualization():
                 # 添加可视化相关的提示
                 enhanced_question = f"请为以下需求生成适当的可视化（柱状图、折线图、饼图、散点图或表格）：{viz_question}"
                 
-                result = st.session_state.ai_agent.process_query(
+                result = get_agent().process_query(
                     enhanced_question,
                     st.session_state.data
                 )
                 
                 if result['success']:
                     st.markdown("### 可视化结果")
-                    st.session_state.visualizer.render_response(result['data'])
+                    get_visualizer().render_response(result['data'])
                     
                     with st.expander("技术详情"):
                         st.json(result)
@@ -262,12 +291,12 @@ def show_data_exploration():
         return
     
     # 自动数据探索
-    st.session_state.visualizer.create_data_exploration_charts(st.session_state.data)
+    get_visualizer().create_data_exploration_charts(st.session_state.data)
     
     # 相关性分析
     st.markdown("---")
     if st.button("生成相关性分析"):
-        st.session_state.visualizer.create_correlation_heatmap(st.session_state.data)
+        get_visualizer().create_correlation_heatmap(st.session_state.data)
 
 
 if __name__ == "__main__":
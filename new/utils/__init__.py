@@ -2,8 +2,20 @@
 Utils包 - 数据分析智能工具的工具模块
 """
 
-from .file_handler import FileHandler
-from .ai_agent import DataAnalysisAgent
-from .visualizer import DataVisualizer
+import importlib
 
-__all__ = ['FileHandler', 'DataAnalysisAgent', 'DataVisualizer'] 
\ No newline at end of file
+# 各模块依赖较重（langchain、plotly等），按需在首次访问时导入
+_LAZY_IMPORTS = {
+    'FileHandler': '.file_handler',
+    'DataAnalysisAgent': '.ai_agent',
+    'DataVisualizer': '.visualizer',
+}
+
+__all__ = ['FileHandler', 'DataAnalysisAgent', 'DataVisualizer']
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        module = importlib.import_module(_LAZY_IMPORTS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,49 @@
+"""
+数值计算内核 - 图表摘要用到的数值计算，安装了numba时编译为本地代码
+"""
+
+import numpy as np
+
+# numba导入和编译较慢，首次调用时才初始化
+_percentages_kernel = None
+
+
+def _percentages_numpy(arr: np.ndarray) -> np.ndarray:
+    """未安装numba时的向量化实现"""
+    return arr * (100.0 / arr.sum())
+
+
+def _load_percentages_kernel():
+    """加载占比计算内核，优先使用numba编译版本"""
+    try:
+        from numba import njit
+    except ImportError:
+        return _percentages_numpy
+
+    # error_model='numpy'：总和为0时与NumPy一致返回inf/nan，而不是抛出异常；
+    # 不开启fastmath，否则编译器可假定不存在nan/inf，上述结果无法保证
+    @njit(cache=True, error_model='numpy')
+    def _percentages_jit(arr):
+        s = arr.sum()
+        out = np.empty_like(arr)
+        for i in range(arr.size):
+            out[i] = arr[i] * 100.0 / s
+        return out
+
+    return _percentages_jit
+
+
+def percentages(arr: np.ndarray) -> np.ndarray:
+    """
+    计算各元素占总和的百分比
+
+    Args:
+        arr: float64一维数组
+
+    Returns:
+        np.ndarray: 与arr等长的百分比数组
+    """
+    global _percentages_kernel
+    if _percentages_kernel is None:
+        _percentages_kernel = _load_percentages_kernel()
+    return _percentages_kernel(np.ascontiguousarray(arr, dtype=np.float64))
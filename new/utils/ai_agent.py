@@ -2,11 +2,148 @@
 AI代理模块 - 负责与GLM-4模型交互，处理数据分析问题
 """
 
+import asyncio
+import collections
+import io
 import json
+import threading
 import pandas as pd
+import streamlit as st
+import tiktoken
+from langchain_core.messages import SystemMessage
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
 from langchain_openai import ChatOpenAI
 from pydantic import SecretStr
-from typing import Dict, Any, Optional
+from typing import Dict, Iterator, List, Any, Optional
+
+from .file_handler import get_data_hash, get_summary
+
+
+@st.cache_resource
+def get_llm_semaphore() -> threading.Semaphore:
+    """所有会话共享的模型调用信号量，限制同时进行的请求数，避免触发接口限流"""
+    return threading.Semaphore(4)
+
+
+@st.cache_data(ttl=24*60*60, show_spinner=False)
+def _build_data_info(df_hash: str, max_tokens: int, _df: pd.DataFrame, _enc) -> str:
+    """
+    生成数据信息，按重要程度（结构 → 数值统计 → 分类分布 → 数据样本）
+    依次写入，直至用尽token预算。结果按数据指纹缓存，同一份数据的多次提问无需重复生成
+    
+    Args:
+        df_hash: 数据指纹，作为缓存键
+        max_tokens: 数据信息的token预算
+        _df: pandas DataFrame（不参与缓存键计算）
+        _enc: tiktoken编码器，为None时按字符数估算（不参与缓存键计算）
+        
+    Returns:
+        数据信息字符串
+    """
+    sections = []
+
+    # 统计摘要按数据指纹缓存，同一份数据只计算一次
+    summary = get_summary(_df, df_hash)
+    null_counts = summary['null_counts']
+    non_null_counts = len(_df) - null_counts
+    unique_counts = summary['nunique']
+    numeric_stats = summary['describe'].to_dict()
+    top_values = summary['top_values']
+
+    # 基本信息和列结构
+    rows, cols = _df.shape
+    schema_parts = [f"数据集基本信息：", f"总行数：{rows}", f"总列数：{cols}", "", "列信息："]
+    for col in _df.columns:
+        schema_parts.append(
+            f"列名：{col}，数据类型：{_df[col].dtype}，非空值：{non_null_counts[col]}个，"
+            f"空值：{null_counts[col]}个，唯一值：{unique_counts[col]}个"
+        )
+    sections.append("\n".join(schema_parts))
+
+    # 数值列统计信息
+    if numeric_stats:
+        stats_parts = ["数值列统计："]
+        for col, stats in numeric_stats.items():
+            stats_parts.append(
+                f"{col}：均值={_format_stat(stats['mean'], '.2f')}, 最大值={_format_stat(stats['max'])}, "
+                f"最小值={_format_stat(stats['min'])}, 标准差={_format_stat(stats['std'], '.2f')}"
+            )
+        sections.append("\n".join(stats_parts))
+
+    # 分类列值分布
+    if top_values:
+        counts_parts = ["分类列值分布（前10个）："]
+        for col, counts in top_values.items():
+            counts_parts.append(f"{col}：")
+            counts_parts.extend(f"  {value}: {count}次" for value, count in counts.items())
+        sections.append("\n".join(counts_parts))
+
+    info_parts = []
+    remaining = max_tokens
+    for section in sections:
+        tokens = _count_tokens(_enc, section)
+        if tokens > remaining:
+            info_parts.append("（受上下文长度限制，其余数据信息已省略）")
+            return "\n\n".join(info_parts)
+        info_parts.append(section)
+        remaining -= tokens
+
+    # 如果预算允许，提供完整数据
+    if len(_df) <= 100:
+        full_data = "完整数据集：\n" + _format_rows(_df)
+        tokens = _count_tokens(_enc, full_data)
+        if tokens <= remaining:
+            info_parts.append(full_data)
+            return "\n\n".join(info_parts)
+
+    # 否则按前10行、后10行、中间10行的顺序提供样本
+    mid_start = max(len(_df) // 2 - 5, 0)
+    mid_end = min(len(_df) // 2 + 5, len(_df))
+    samples = [
+        "前10行：\n" + _format_rows(_df.head(10)),
+        "最后10行：\n" + _format_rows(_df.tail(10)),
+        f"中间部分（第{mid_start+1}-{mid_end}行）：\n" + _format_rows(_df.iloc[mid_start:mid_end]),
+    ]
+    info_parts.append("数据样本：")
+    for sample in samples:
+        tokens = _count_tokens(_enc, sample)
+        if tokens > remaining:
+            info_parts.append("（受上下文长度限制，其余数据样本已省略）")
+            break
+        info_parts.append(sample)
+        remaining -= tokens
+
+    return "\n\n".join(info_parts)
+
+
+def _format_stat(value, spec: str = '') -> str:
+    """格式化统计值，Arrow类型下缺失的统计量（如仅一个非空值时的标准差）为<NA>，统一输出nan"""
+    if pd.isna(value):
+        return 'nan'
+    return format(value, spec)
+
+
+def _count_tokens(enc, text: str) -> int:
+    """计算文本的token数量，编码器不可用时按字符数估算（中文约一字一token，偏保守）"""
+    if enc is None:
+        return len(text)
+    return len(enc.encode(text))
+
+
+def _format_rows(sub_df: pd.DataFrame) -> str:
+    """
+    将数据片段整体序列化为以"|"分隔的文本，首列为从1开始的行号
+    
+    Args:
+        sub_df: 需要输出的数据片段
+    
+    Returns:
+        带表头的分隔文本
+    """
+    buf = io.StringIO()
+    sub_df.set_axis(sub_df.index + 1).to_csv(buf, sep='|', index_label='行号')
+    return buf.getvalue().rstrip("\n")
 
 
 class DataAnalysisAgent:
@@ -21,6 +158,17 @@ class DataAnalysisAgent:
             temperature=0.1  # 降低随机性，提高结果一致性
         )
         
+        # 数据信息的token预算，按优先级填充，避免超出模型上下文
+        # 编码器首次使用时才加载（需联网下载词表）
+        self._enc = None
+        self._enc_loaded = False
+        self.max_data_info_tokens = 60000
+        
+        # 相同数据上的相同问题直接返回缓存结果（LRU淘汰）
+        self._cache = collections.OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.max_cache_entries = 64
+        
         self.system_prompt = """你是一位专业的数据分析助手，请根据提供的完整数据集回答用户问题。
 
 重要要求：
@@ -57,6 +205,16 @@ class DataAnalysisAgent:
 输出示例：
 正确：{"bar": {"columns": ["产品A", "产品B"], "data": [150, 200]}}
 错误：{"bar": {"columns": ["产品A", "产品B"], "data": ["150", "200"]}}"""
+        
+        # 提示词模板只构建一次：系统提示在前、数据信息居中、用户问题在最后，
+        # 同一份数据的所有请求共享相同前缀，便于服务端复用前缀缓存。
+        # 系统提示中含有JSON花括号，直接作为消息传入以免被当作模板变量
+        self.prompt = ChatPromptTemplate.from_messages([
+            SystemMessage(content=self.system_prompt),
+            ("system", "完整数据集信息：\n{data_info}"),
+            ("human", "用户问题：{question}\n\n请基于上述真实数据回答问题，确保所有数值都来自实际计算。严格按照JSON格式输出。")
+        ])
+        self.chain = self.prompt | self.model
     
     def process_query(self, user_question: str, df: pd.DataFrame) -> Dict[str, Any]:
         """
@@ -69,49 +227,19 @@ class DataAnalysisAgent:
         Returns:
             解析后的响应结果
         """
+        cached = self.get_cached_result(user_question, df)
+        if cached is not None:
+            return cached
+        
         try:
-            # 生成完整的数据信息
             data_info = self._generate_complete_data_info(df)
-            
-            # 构建完整的提示信息
-            full_prompt = f"""
-{self.system_prompt}
-
-完整数据集信息：
-{data_info}
-
-用户问题：{user_question}
-
-请基于上述真实数据回答问题，确保所有数值都来自实际计算。严格按照JSON格式输出。
-"""
+            prompt_inputs = self._build_prompt_inputs(user_question, data_info)
             
             # 调用模型获取响应
-            response = self.model.invoke(full_prompt)
-            response_text = response.content.strip()
-            
-            # 尝试解析JSON响应
-            try:
-                result = json.loads(response_text)
-                # 验证数据是否合理
-                if self._validate_data_consistency(result, df):
-                    return {"success": True, "data": result, "raw_response": response_text}
-                else:
-                    return {
-                        "success": False, 
-                        "error": "AI返回的数据与实际数据不一致", 
-                        "raw_response": response_text
-                    }
-            except json.JSONDecodeError as e:
-                # 如果JSON解析失败，尝试提取JSON部分
-                result = self._extract_json_from_text(response_text)
-                if result and self._validate_data_consistency(result, df):
-                    return {"success": True, "data": result, "raw_response": response_text}
-                else:
-                    return {
-                        "success": False, 
-                        "error": f"JSON解析失败或数据不一致: {str(e)}", 
-                        "raw_response": response_text
-                    }
+            response = self._invoke(prompt_inputs)
+            result = self.parse_response(response.content.strip(), df)
+            self.cache_result(user_question, df, result)
+            return result
                     
         except Exception as e:
             return {
@@ -120,105 +248,225 @@ class DataAnalysisAgent:
                 "raw_response": ""
             }
     
-    def _generate_complete_data_info(self, df: pd.DataFrame) -> str:
+    async def aprocess_query(self, user_question: str, df: pd.DataFrame) -> Dict[str, Any]:
         """
-        生成完整的数据信息，包含所有数据内容
+        异步处理用户查询，等待模型响应期间不阻塞事件循环
         
         Args:
-            df: pandas DataFrame
+            user_question: 用户问题
+            df: 完整的DataFrame数据
             
         Returns:
-            完整的数据信息字符串
+            解析后的响应结果
         """
+        cached = self.get_cached_result(user_question, df)
+        if cached is not None:
+            return cached
+        
         try:
-            info_parts = []
+            data_info = self._generate_complete_data_info(df)
+            prompt_inputs = self._build_prompt_inputs(user_question, data_info)
             
-            # 基本信息
-            rows, cols = df.shape
-            info_parts.append(f"数据集基本信息：")
-            info_parts.append(f"总行数：{rows}")
-            info_parts.append(f"总列数：{cols}")
-            info_parts.append("")
+            # 信号量的获取与释放放在同一个工作线程内完成，
+            # 任务在等待期间被取消时，线程结束后仍会归还名额
+            response = await asyncio.to_thread(self._invoke, prompt_inputs)
+            result = self.parse_response(response.content.strip(), df)
+            self.cache_result(user_question, df, result)
+            return result
+                    
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"AI处理错误: {str(e)}",
+                "raw_response": ""
+            }
+    
+    def stream_query(self, user_question: str, df: pd.DataFrame) -> Iterator[str]:
+        """
+        流式处理用户查询，逐段返回模型输出的文本，
+        完整文本需交给parse_response解析（可用cache_result缓存解析结果）
+        
+        Args:
+            user_question: 用户问题
+            df: 完整的DataFrame数据
             
-            # 列信息和统计
-            info_parts.append("列信息和详细统计：")
-            for col in df.columns:
-                dtype = str(df[col].dtype)
-                non_null_count = df[col].count()
-                null_count = df[col].isnull().sum()
-                unique_count = df[col].nunique()
-                
-                info_parts.append(f"列名：{col}")
-                info_parts.append(f"  数据类型：{dtype}")
-                info_parts.append(f"  非空值：{non_null_count}个")
-                info_parts.append(f"  空值：{null_count}个")
-                info_parts.append(f"  唯一值：{unique_count}个")
-                
-                # 如果是数值列，提供统计信息
-                if df[col].dtype in ['int64', 'float64', 'int32', 'float32']:
-                    try:
-                        stats = df[col].describe()
-                        info_parts.append(f"  统计信息：均值={stats['mean']:.2f}, 最大值={stats['max']}, 最小值={stats['min']}, 标准差={stats['std']:.2f}")
-                    except:
-                        pass
-                
-                # 如果是分类列，提供值计数
-                elif df[col].dtype == 'object' or df[col].dtype.name == 'category':
-                    try:
-                        value_counts = df[col].value_counts()
-                        top_values = value_counts.head(10)
-                        info_parts.append(f"  值分布（前10个）：")
-                        for value, count in top_values.items():
-                            info_parts.append(f"    {value}: {count}次")
-                    except:
-                        pass
-                
-                info_parts.append("")
+        Yields:
+            模型输出的文本片段
+        """
+        data_info = self._generate_complete_data_info(df)
+        prompt_inputs = self._build_prompt_inputs(user_question, data_info)
+        
+        with get_llm_semaphore():
+            for chunk in self.chain.stream(prompt_inputs):
+                yield chunk.content
+    
+    def process_queries(self, questions: List[str], df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """
+        批量处理多个用户问题，所有问题共享同一份数据信息并发请求模型
+        
+        Args:
+            questions: 用户问题列表
+            df: 完整的DataFrame数据
             
-            # 如果数据量不太大，提供完整数据
-            if len(df) <= 100:
-                info_parts.append("完整数据集：")
-                # 将DataFrame转换为更易读的格式
-                for idx, row in df.iterrows():
-                    row_data = []
-                    for col in df.columns:
-                        row_data.append(f"{col}={row[col]}")
-                    info_parts.append(f"第{idx+1}行：{', '.join(row_data)}")
+        Returns:
+            与问题一一对应的解析结果列表
+        """
+        results = [self.get_cached_result(question, df) for question in questions]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+        
+        try:
+            data_info = self._generate_complete_data_info(df)
+            # 各提示词共享"系统提示+数据信息"前缀，便于服务端复用前缀缓存
+            prompts = [self._build_prompt_inputs(questions[i], data_info) for i in pending]
+            # 每个请求单独占用信号量，跨会话的并发总数仍受限
+            responses = RunnableLambda(self._invoke).batch(
+                prompts,
+                config={"max_concurrency": 8},
+                return_exceptions=True
+            )
+        except Exception as e:
+            for i in pending:
+                results[i] = {"success": False, "error": f"AI处理错误: {str(e)}", "raw_response": ""}
+            return results
+        
+        for i, response in zip(pending, responses):
+            if isinstance(response, Exception):
+                results[i] = {"success": False, "error": f"AI处理错误: {str(response)}", "raw_response": ""}
             else:
-                # 数据量大时，提供更多样本
-                info_parts.append("数据样本（包含前10行、中间10行、后10行）：")
-                
-                # 前10行
-                info_parts.append("前10行：")
-                for idx, row in df.head(10).iterrows():
-                    row_data = []
-                    for col in df.columns:
-                        row_data.append(f"{col}={row[col]}")
-                    info_parts.append(f"第{idx+1}行：{', '.join(row_data)}")
-                
-                # 中间10行
-                mid_start = len(df) // 2 - 5
-                mid_end = len(df) // 2 + 5
-                info_parts.append(f"中间部分（第{mid_start+1}-{mid_end}行）：")
-                for idx, row in df.iloc[mid_start:mid_end].iterrows():
-                    row_data = []
-                    for col in df.columns:
-                        row_data.append(f"{col}={row[col]}")
-                    info_parts.append(f"第{idx+1}行：{', '.join(row_data)}")
-                
-                # 后10行
-                info_parts.append("最后10行：")
-                for idx, row in df.tail(10).iterrows():
-                    row_data = []
-                    for col in df.columns:
-                        row_data.append(f"{col}={row[col]}")
-                    info_parts.append(f"第{idx+1}行：{', '.join(row_data)}")
+                results[i] = self.parse_response(response.content.strip(), df)
+                self.cache_result(questions[i], df, results[i])
+        return results
+    
+    def get_cached_result(self, user_question: str, df: pd.DataFrame) -> Optional[Dict[str, Any]]:
+        """
+        查询相同数据、相同问题的缓存结果
+        
+        Args:
+            user_question: 用户问题
+            df: 完整的DataFrame数据
+            
+        Returns:
+            命中时返回缓存的结果，否则返回None
+        """
+        key = (self._data_hash(df), user_question.strip())
+        with self._cache_lock:
+            if key not in self._cache:
+                return None
+            self._cache.move_to_end(key)
+            return self._cache[key]
+    
+    def cache_result(self, user_question: str, df: pd.DataFrame, result: Dict[str, Any]) -> None:
+        """
+        缓存分析结果，仅缓存成功的结果，失败时下次提问会重新请求模型
+        
+        Args:
+            user_question: 用户问题
+            df: 完整的DataFrame数据
+            result: 解析后的响应结果
+        """
+        if not result.get('success'):
+            return
+        key = (self._data_hash(df), user_question.strip())
+        with self._cache_lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_cache_entries:
+                self._cache.popitem(last=False)
+    
+    def _invoke(self, prompt_inputs: Dict[str, str]):
+        """在并发限制内调用模型"""
+        with get_llm_semaphore():
+            return self.chain.invoke(prompt_inputs)
+    
+    def _build_prompt_inputs(self, user_question: str, data_info: str) -> Dict[str, str]:
+        """
+        构建提示词模板的输入变量
+        
+        Args:
+            user_question: 用户问题
+            data_info: 数据信息
+            
+        Returns:
+            模板变量字典
+        """
+        return {"data_info": data_info, "question": user_question}
+    
+    def parse_response(self, response_text: str, df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        解析并校验模型响应
+        
+        Args:
+            response_text: 模型返回的文本
+            df: 完整的DataFrame数据
             
-            return "\n".join(info_parts)
+        Returns:
+            解析后的响应结果
+        """
+        # 尝试解析JSON响应
+        try:
+            result = json.loads(response_text)
+            # 验证数据是否合理
+            if self._validate_data_consistency(result, df):
+                return {"success": True, "data": result, "raw_response": response_text}
+            else:
+                return {
+                    "success": False, 
+                    "error": "AI返回的数据与实际数据不一致", 
+                    "raw_response": response_text
+                }
+        except json.JSONDecodeError as e:
+            # 如果JSON解析失败，尝试提取JSON部分
+            result = self._extract_json_from_text(response_text)
+            if result and self._validate_data_consistency(result, df):
+                return {"success": True, "data": result, "raw_response": response_text}
+            else:
+                return {
+                    "success": False, 
+                    "error": f"JSON解析失败或数据不一致: {str(e)}", 
+                    "raw_response": response_text
+                }
+    
+    def _generate_complete_data_info(self, df: pd.DataFrame) -> str:
+        """
+        生成数据信息（带缓存）
+        
+        生成结果按数据指纹缓存，之后对同一份数据提问时直接作为提示词前缀使用
+        
+        Args:
+            df: pandas DataFrame
             
+        Returns:
+            数据信息字符串
+        """
+        try:
+            return _build_data_info(self._data_hash(df), self.max_data_info_tokens, df, self._get_encoder())
         except Exception as e:
+            # 出错时不写入缓存，下次提问重新生成
             return f"生成数据信息时出错：{str(e)}"
     
+    def _get_encoder(self):
+        """
+        获取tiktoken编码器，首次调用时加载
+        
+        加载需要从网络下载词表，失败时不再重试，返回None改为按字符数估算token
+        
+        Returns:
+            tiktoken编码器，不可用时返回None
+        """
+        if not self._enc_loaded:
+            try:
+                self._enc = tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                self._enc = None
+            self._enc_loaded = True
+        return self._enc
+    
+    def _data_hash(self, df: pd.DataFrame) -> str:
+        """获取数据指纹，优先复用上传时已计算的结果"""
+        return get_data_hash(df)
+    
     def _validate_data_consistency(self, ai_result: Dict, df: pd.DataFrame) -> bool:
         """
         验证AI返回的数据是否与实际数据一致
@@ -230,6 +478,9 @@ class DataAnalysisAgent:
         Returns:
             是否一致
         """
+        if not isinstance(ai_result, dict):
+            return True  # 非字典结果无可校验的内容，交由渲染环节处理
+        
         try:
             # 对于表格数据，验证行数是否合理
             if 'table' in ai_result:
@@ -248,7 +499,10 @@ class DataAnalysisAgent:
                     if len(chart_data['data']) != len(chart_data['columns']):
                         return False
                     # 检查数据点数量是否合理（不应超过唯一值数量太多）
-                    max_unique_values = max([df[col].nunique() for col in df.columns if df[col].dtype == 'object'], default=len(df))
+                    # 唯一值数量取自导入时的统计摘要，无需重新扫描数据
+                    text_cols = df.select_dtypes(include=['object', 'string']).columns
+                    unique_counts = get_summary(df)['nunique']
+                    max_unique_values = unique_counts[text_cols].max() if not text_cols.empty else len(df)
                     if len(chart_data['data']) > max_unique_values * 2:
                         return False
             
@@ -258,22 +512,19 @@ class DataAnalysisAgent:
             return True  # 如果验证过程出错，则假设数据有效
     
     def _extract_json_from_text(self, text: str) -> Optional[Dict]:
-        """从文本中提取JSON内容"""
-        import re
-        
-        # 尝试找到JSON格式的内容
-        json_patterns = [
-            r'\{[^{}]*\}',  # 简单的JSON对象
-            r'\{.*?\}',     # 更宽泛的JSON对象
-        ]
+        """
+        从文本中提取JSON内容
         
-        for pattern in json_patterns:
-            matches = re.findall(pattern, text, re.DOTALL)
-            for match in matches:
-                try:
-                    return json.loads(match)
-                except json.JSONDecodeError:
-                    continue
+        从每个"{"处尝试用raw_decode解析一个完整的JSON对象，第一个成功的即为结果
+        """
+        decoder = json.JSONDecoder()
+        i = 0
+        while (i := text.find('{', i)) != -1:
+            try:
+                obj, _ = decoder.raw_decode(text, i)
+                return obj
+            except json.JSONDecodeError:
+                i += 1
         
         return None
     
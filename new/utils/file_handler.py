@@ -2,12 +2,89 @@
 文件处理模块 - 负责文件上传、解析和数据预处理
 """
 
+import hashlib
+import charset_normalizer
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 import streamlit as st
 from typing import Optional, Tuple
 import io
 
 
+def compute_data_hash(df: pd.DataFrame) -> str:
+    """
+    计算DataFrame的内容指纹，用作缓存键
+    
+    Args:
+        df: DataFrame数据
+        
+    Returns:
+        十六进制指纹字符串
+    """
+    hasher = hashlib.md5(pd.util.hash_pandas_object(df, index=True).values)
+    # 行哈希不包含列名，需额外计入列名和类型
+    hasher.update(str(df.dtypes.to_dict()).encode('utf-8'))
+    return hasher.hexdigest()
+
+
+def build_summary(df: pd.DataFrame) -> dict:
+    """
+    计算各列的统计摘要（数据不变时结果不变，可在导入时计算一次后复用）
+    
+    Args:
+        df: DataFrame数据
+        
+    Returns:
+        包含describe、nunique、null_counts、top_values的字典
+    """
+    numeric_df = df.select_dtypes(include='number')
+    categorical_cols = df.select_dtypes(include=['object', 'category', 'string']).columns
+    return {
+        'describe': numeric_df.describe() if not numeric_df.columns.empty else pd.DataFrame(),
+        'nunique': df.nunique(),
+        'null_counts': df.isna().sum(),
+        'top_values': {col: df[col].value_counts().head(10) for col in categorical_cols}
+    }
+
+
+def get_data_hash(df: pd.DataFrame) -> str:
+    """
+    获取数据指纹，df为当前会话的数据时直接复用导入时计算好的结果
+    
+    Args:
+        df: DataFrame数据
+        
+    Returns:
+        十六进制指纹字符串
+    """
+    if df is st.session_state.get('data') and st.session_state.get('data_hash'):
+        return st.session_state.data_hash
+    return compute_data_hash(df)
+
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def _cached_summary(data_hash: str, _df: pd.DataFrame) -> dict:
+    """按数据指纹缓存统计摘要，各会话共享同一份结果（只读）"""
+    return build_summary(_df)
+
+
+def get_summary(df: pd.DataFrame, data_hash: Optional[str] = None) -> dict:
+    """
+    获取DataFrame的统计摘要，同一份数据只计算一次
+    
+    Args:
+        df: DataFrame数据
+        data_hash: 数据指纹，省略时自动获取
+        
+    Returns:
+        统计摘要字典（共享对象，请勿修改）
+    """
+    if data_hash is None:
+        data_hash = get_data_hash(df)
+    return _cached_summary(data_hash, df)
+
+
 class FileHandler:
     """文件处理类"""
     
@@ -15,6 +92,7 @@ class FileHandler:
         """初始化文件处理器"""
         self.supported_formats = ['csv', 'xlsx', 'xls']
         self.max_file_size_mb = 200
+        self.max_rows = 10000  # 限制数据行数（避免处理过大的数据集）
     
     def upload_file(self) -> Optional[pd.DataFrame]:
         """
@@ -30,6 +108,10 @@ class FileHandler:
         )
         
         if uploaded_file is not None:
+            # 页面每次刷新都会返回同一个上传文件，已导入过时不再重复解析
+            if uploaded_file.file_id == st.session_state.get('uploaded_file_id'):
+                return None
+            
             try:
                 # 检查文件大小
                 file_size_mb = len(uploaded_file.getvalue()) / (1024 * 1024)
@@ -42,6 +124,9 @@ class FileHandler:
                 df = self._parse_file(uploaded_file, file_extension)
                 
                 if df is not None:
+                    # 记录数据指纹，供后续分析复用缓存
+                    st.session_state.data_hash = compute_data_hash(df)
+                    st.session_state.uploaded_file_id = uploaded_file.file_id
                     st.success(f"文件上传成功！数据维度：{df.shape[0]}行 × {df.shape[1]}列")
                     return df
                 else:
@@ -67,22 +152,31 @@ class FileHandler:
         """
         try:
             if file_extension == 'csv':
-                # 尝试不同的编码格式
-                encodings = ['utf-8', 'gbk', 'gb2312', 'latin-1']
+                # 先用文件开头部分识别编码；开头之后才出现的非ASCII内容可能识别不准，
+                # 解码失败时依次尝试常用编码
+                raw = uploaded_file.getvalue()
+                encodings = [self._detect_encoding(raw)]
+                encodings += [e for e in ['utf-8', 'gbk', 'gb2312', 'latin-1'] if e not in encodings]
                 for encoding in encodings:
                     try:
-                        uploaded_file.seek(0)  # 重置文件指针
-                        df = pd.read_csv(uploaded_file, encoding=encoding)
-                        return self._clean_dataframe(df)
+                        df = self._read_csv(raw, encoding)
+                        break
                     except UnicodeDecodeError:
-                        continue
-                    except Exception as e:
                         if encoding == encodings[-1]:  # 最后一个编码尝试失败
-                            raise e
-                        continue
+                            raise
+                if len(df) > self.max_rows:
+                    st.warning(f"数据量较大，仅显示前{self.max_rows}行")
+                    df = df.head(self.max_rows)
+                return self._clean_dataframe(df)
                         
             elif file_extension in ['xlsx', 'xls']:
-                df = pd.read_excel(uploaded_file)
+                # xlsx使用原生实现的calamine引擎解析，字符串列直接读为Arrow类型
+                engine = 'calamine' if file_extension == 'xlsx' else 'xlrd'
+                # 多读一行用于判断是否超出行数上限
+                df = pd.read_excel(uploaded_file, engine=engine, dtype_backend='pyarrow', nrows=self.max_rows + 1)
+                if len(df) > self.max_rows:
+                    st.warning(f"数据量较大，仅显示前{self.max_rows}行")
+                    df = df.head(self.max_rows)
                 return self._clean_dataframe(df)
             
             return None
@@ -91,6 +185,72 @@ class FileHandler:
             st.error(f"文件解析错误：{str(e)}")
             return None
     
+    def _read_csv(self, raw: bytes, encoding: str) -> pd.DataFrame:
+        """
+        按指定编码解析CSV，优先使用Arrow，失败时退回pandas
+        
+        Args:
+            raw: 文件内容
+            encoding: 文件编码
+            
+        Returns:
+            最多max_rows+1行的DataFrame
+        """
+        try:
+            return self._read_csv_arrow(raw, encoding)
+        except pa.ArrowInvalid:
+            # Arrow按首个数据块推断列类型，后续数据类型不符时（或UTF-8内容无效时）退回pandas解析
+            return pd.read_csv(io.BytesIO(raw), encoding=encoding, nrows=self.max_rows + 1)
+    
+    def _read_csv_arrow(self, raw: bytes, encoding: str) -> pd.DataFrame:
+        """
+        使用Arrow流式解析CSV，读取到超出行数上限的一行后不再解析剩余内容
+        
+        Args:
+            raw: 文件内容
+            encoding: 文件编码
+            
+        Returns:
+            最多max_rows+1行的DataFrame，列名与pandas一致
+        """
+        # 列名沿用pandas的规则：重复列名加.1、.2后缀，空列名记为Unnamed: n
+        names = pd.read_csv(io.BytesIO(raw), encoding=encoding, nrows=0).columns.tolist()
+        
+        # 块设置得较大，使列类型基于尽量多的行推断
+        reader = pa_csv.open_csv(
+            io.BytesIO(raw),
+            read_options=pa_csv.ReadOptions(encoding=encoding, block_size=16 * 1024 * 1024),
+            convert_options=pa_csv.ConvertOptions(strings_can_be_null=True)
+        )
+        batches = []
+        num_rows = 0
+        for batch in reader:
+            batches.append(batch)
+            num_rows += batch.num_rows
+            if num_rows > self.max_rows:
+                break
+        table = pa.Table.from_batches(batches, schema=reader.schema).slice(0, self.max_rows + 1)
+        # 需在转换前改名：部分pyarrow版本不允许重复列名的表转换为DataFrame
+        if len(names) == table.num_columns:
+            table = table.rename_columns(names)
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+    
+    def _detect_encoding(self, raw: bytes) -> str:
+        """
+        识别文件编码
+        
+        Args:
+            raw: 文件内容
+            
+        Returns:
+            编码名称，无法识别时返回utf-8
+        """
+        best = charset_normalizer.from_bytes(raw[:65536]).best()
+        if best is None or best.encoding == 'ascii':
+            # 开头为纯ASCII时后续内容仍可能是UTF-8
+            return 'utf-8'
+        return best.encoding
+    
     def _clean_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         清理DataFrame数据
@@ -112,11 +272,8 @@ class FileHandler:
             # 清理列名（去除前后空格）
             df.columns = df.columns.astype(str).str.strip()
             
-            # 限制数据行数（避免处理过大的数据集）
-            max_rows = 10000
-            if len(df) > max_rows:
-                st.warning(f"数据量较大，仅显示前{max_rows}行")
-                df = df.head(max_rows)
+            # 统一转换为Arrow类型存储，字符串列不再占用Python对象，统计运算也更快
+            df = df.convert_dtypes(dtype_backend='pyarrow')
             
             return df
             
@@ -135,6 +292,9 @@ class FileHandler:
             st.warning("暂无数据")
             return
         
+        summary = get_summary(df)
+        null_counts = summary['null_counts']
+        
         # 基本信息
         col1, col2, col3 = st.columns(3)
         with col1:
@@ -142,7 +302,7 @@ class FileHandler:
         with col2:
             st.metric("总列数", df.shape[1])
         with col3:
-            st.metric("缺失值", df.isnull().sum().sum())
+            st.metric("缺失值", int(null_counts.sum()))
         
         # 数据预览
         st.subheader("数据预览")
@@ -152,18 +312,18 @@ class FileHandler:
         with st.expander("列信息详情"):
             col_info = pd.DataFrame({
                 '列名': df.columns,
-                '数据类型': df.dtypes.astype(str),
-                '非空值数量': df.count().values,
-                '空值数量': df.isnull().sum().values,
-                '唯一值数量': [df[col].nunique() for col in df.columns]
+                '数据类型': df.dtypes.astype(str).values,
+                '非空值数量': (len(df) - null_counts).values,
+                '空值数量': null_counts.values,
+                '唯一值数量': summary['nunique'].values
             })
             st.dataframe(col_info, use_container_width=True)
+            st.caption("数据以Apache Arrow类型存储（如 string[pyarrow]、int64[pyarrow]），空值统一显示为 <NA>")
         
         # 数值列统计
-        numeric_df = df.select_dtypes(include=['number'])
-        if not numeric_df.empty:
+        if not summary['describe'].empty:
             with st.expander("数值列统计"):
-                st.dataframe(numeric_df.describe(), use_container_width=True)
+                st.dataframe(summary['describe'], use_container_width=True)
     
     def get_sample_data(self) -> pd.DataFrame:
         """
@@ -191,7 +351,7 @@ class FileHandler:
                     '利润': round(profit, 2)
                 })
         
-        return pd.DataFrame(data)
+        return self._clean_dataframe(pd.DataFrame(data))
     
     def export_data(self, df: pd.DataFrame, filename: str = "processed_data") -> None:
         """
@@ -202,10 +362,10 @@ class FileHandler:
             filename: 文件名
         """
         try:
-            # 转换为CSV格式的字节流
-            csv_buffer = io.StringIO()
+            # 直接写入字节缓冲区，避免先生成字符串再整体编码
+            csv_buffer = io.BytesIO()
             df.to_csv(csv_buffer, index=False, encoding='utf-8-sig')
-            csv_data = csv_buffer.getvalue().encode('utf-8-sig')
+            csv_data = csv_buffer.getvalue()
             
             # 提供下载按钮
             st.download_button(
@@ -2,22 +2,323 @@
 可视化模块 - 负责生成图表和表格展示
 """
 
+import io
+import json
+
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 import pandas as pd
 import streamlit as st
 from typing import Dict, List, Any, Optional
 
+from ._num_kernels import percentages
+from .file_handler import get_data_hash
+
+
+# st.plotly_chart通过plotly.io序列化图表，安装了orjson时改用它编码大图表
+try:
+    import orjson  # noqa: F401
+    pio.json.config.default_engine = 'orjson'
+except ImportError:
+    pass
+
+
+def _is_strictly_increasing(values: List[Any]) -> bool:
+    """
+    判断类别是否唯一且已按升序排列
+    
+    st.bar_chart/st.line_chart会按类别排序并合并重复类别，
+    只有满足该条件时原生图表才能保持AI返回的顺序
+    """
+    try:
+        return all(a < b for a, b in zip(values, values[1:]))
+    except TypeError:
+        return False
+
+
+def _as_array(values) -> np.ndarray:
+    """将数值数据转为已知类型的NumPy数组，纯数值为float64，否则为object"""
+    if all(isinstance(x, (int, float)) for x in values):
+        return np.asarray(values, dtype=np.float64)
+    return np.asarray(values, dtype=object)
+
+
+def _as_label_array(values) -> np.ndarray:
+    """将类别/标签转为NumPy数组，保留原始类型（整数年份等不转为浮点数）"""
+    arr = np.asarray(values)
+    # 数字与字符串混合时NumPy会统一转成字符串，此时保留原值
+    if arr.dtype.kind == 'U' and not all(isinstance(x, str) for x in values):
+        return np.asarray(values, dtype=object)
+    return arr
+
+
+def _build_bar_fig(columns: List[Any], data: List[Any], palette: tuple) -> go.Figure:
+    """构建柱状图"""
+    data_arr = _as_array(data)
+    fig = go.Figure(data=[
+        go.Bar(
+            x=_as_label_array(columns),
+            y=data_arr,
+            marker_color=palette,
+            text=data_arr,
+            textposition='outside'
+        )
+    ])
+    
+    # 设置图表样式
+    fig.update_layout(
+        title="柱状图分析",
+        xaxis_title="类别",
+        yaxis_title="数值",
+        showlegend=False,
+        height=500,
+        template="plotly_white"
+    )
+    return fig
+
+
+def _build_line_fig(columns: List[Any], data: List[Any], palette: tuple) -> go.Figure:
+    """构建折线图"""
+    data_arr = _as_array(data)
+    fig = go.Figure(data=[
+        go.Scatter(
+            x=_as_label_array(columns),
+            y=data_arr,
+            mode='lines+markers',
+            line=dict(color=palette[0], width=3),
+            marker=dict(size=8, color=palette[1]),
+            text=data_arr,
+            textposition='top center'
+        )
+    ])
+    
+    # 设置图表样式
+    fig.update_layout(
+        title="趋势分析",
+        xaxis_title="时间/类别",
+        yaxis_title="数值",
+        showlegend=False,
+        height=500,
+        template="plotly_white"
+    )
+    return fig
+
+
+def _build_pie_fig(labels: List[Any], values: List[Any], palette: tuple) -> go.Figure:
+    """构建饼图"""
+    fig = go.Figure(data=[
+        go.Pie(
+            labels=labels,
+            values=np.asarray(values, dtype=np.float64),
+            hole=0.3,  # 创建圆环图效果
+            marker_colors=palette
+        )
+    ])
+    
+    # 设置图表样式
+    fig.update_layout(
+        title="比例分析",
+        height=500,
+        template="plotly_white"
+    )
+    return fig
+
+
+def _build_scatter_fig(x_data: List[Any], y_data: List[Any], labels: List[Any], palette: tuple) -> go.Figure:
+    """构建散点图"""
+    fig = go.Figure(data=[
+        go.Scatter(
+            x=_as_array(x_data),
+            y=_as_array(y_data),
+            mode='markers',
+            marker=dict(
+                size=10,
+                color=palette[0],
+                opacity=0.7
+            ),
+            text=labels,
+            textposition='top center'
+        )
+    ])
+    
+    # 设置图表样式
+    fig.update_layout(
+        title="散点分析",
+        xaxis_title="X轴",
+        yaxis_title="Y轴",
+        showlegend=False,
+        height=500,
+        template="plotly_white"
+    )
+    return fig
+
+
+@st.cache_data(max_entries=128, ttl=3600, show_spinner=False)
+def _build_series_summary(columns: tuple, data: tuple, category_label: str) -> pd.DataFrame:
+    """构建柱状图/折线图的数据详情表"""
+    return pd.DataFrame({
+        category_label: _as_label_array(columns),
+        '数值': _as_array(data)
+    }, copy=False)
+
+
+@st.cache_data(max_entries=128, ttl=3600, show_spinner=False)
+def _build_pie_summary(labels: tuple, values: tuple) -> pd.DataFrame:
+    """构建饼图的数据详情表，占比列预先格式化为字符串"""
+    arr = np.asarray(values, dtype=np.float64)
+    return pd.DataFrame({
+        '类别': _as_label_array(labels),
+        '数值': arr,
+        '占比': np.char.mod('%.1f%%', percentages(arr)).astype(object)
+    }, copy=False)
+
+
+@st.cache_data(max_entries=128, ttl=3600, show_spinner=False)
+def _build_scatter_summary(labels: tuple, x_data: tuple, y_data: tuple) -> pd.DataFrame:
+    """构建散点图的数据详情表"""
+    return pd.DataFrame({
+        '标签': _as_label_array(labels),
+        'X值': _as_array(x_data),
+        'Y值': _as_array(y_data)
+    }, copy=False)
+
+
+# 以下基于整份数据的计算以数据指纹作为缓存键，DataFrame本身不参与哈希
+
+@st.cache_data(max_entries=128, ttl=3600, show_spinner=False)
+def _build_histogram_fig(data_hash: str, column: str, palette: tuple, _df: pd.DataFrame) -> go.Figure:
+    """构建数值列分布图"""
+    fig = px.histogram(
+        _df, 
+        x=column, 
+        title=f"{column} 分布图",
+        color_discrete_sequence=palette
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+@st.cache_data(max_entries=128, ttl=3600, show_spinner=False)
+def _build_pair_scatter_fig(data_hash: str, col_x: str, col_y: str, palette: tuple, _df: pd.DataFrame) -> go.Figure:
+    """构建两个数值列的散点图"""
+    fig = px.scatter(
+        _df, 
+        x=col_x, 
+        y=col_y, 
+        title=f"{col_x} vs {col_y}",
+        color_discrete_sequence=palette
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def _numeric_cols(df: pd.DataFrame) -> List[str]:
+    """获取数值列名"""
+    return df.select_dtypes(include=['number']).columns.tolist()
+
+
+def _categorical_cols(df: pd.DataFrame) -> List[str]:
+    """获取分类列名"""
+    return df.select_dtypes(include=['object', 'category', 'string']).columns.tolist()
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _to_categorical(data_hash: str, _df: pd.DataFrame) -> pd.DataFrame:
+    """
+    将取值重复度高的文本列转换为category类型
+    
+    转换结果作为共享对象缓存，各会话与重新运行直接复用同一个DataFrame（只读）
+    
+    Args:
+        data_hash: 数据指纹，作为缓存键
+        _df: 原始DataFrame（不参与缓存键计算）
+        
+    Returns:
+        转换后的DataFrame
+    """
+    out = _df.copy()
+    if len(out) == 0:
+        return out
+    for col in out.select_dtypes(include=['object', 'string']).columns:
+        if out[col].nunique() / len(out) < 0.5:
+            out[col] = out[col].astype('category')
+    return out
+
+
+@st.cache_data(max_entries=128, ttl=3600, show_spinner=False)
+def _value_counts_top(data_hash: str, col: str, _df: pd.DataFrame, k: int = 10) -> pd.Series:
+    """统计某列出现次数最多的前k个取值"""
+    return _df[col].value_counts().head(k)
+
+
+@st.cache_data(max_entries=128, ttl=3600, show_spinner=False)
+def _corr_matrix(data_hash: str, _df: pd.DataFrame) -> pd.DataFrame:
+    """计算数值列的相关性矩阵"""
+    numeric_df = _df[_numeric_cols(_df)]
+    arr = np.ascontiguousarray(numeric_df.to_numpy(dtype=np.float64, na_value=np.nan))
+    # 含缺失值时需要按列对逐一处理，交给pandas
+    if arr.shape[0] < 2 or np.isnan(arr).any():
+        return numeric_df.corr()
+    
+    # 标准化后一次矩阵乘法即可得到皮尔逊相关系数
+    arr = arr - arr.mean(axis=0)
+    std = arr.std(axis=0, ddof=0)
+    constant = std == 0
+    std[constant] = 1.0
+    arr /= std
+    corr = (arr.T @ arr) / arr.shape[0]
+    # 方差为0的列相关系数无定义，与pandas保持一致置为NaN
+    corr[constant, :] = np.nan
+    corr[:, constant] = np.nan
+    return pd.DataFrame(corr, index=numeric_df.columns, columns=numeric_df.columns)
+
+
+@st.cache_data(max_entries=32, ttl=3600, show_spinner=False)
+def _df_to_csv_bytes(table_key: str, _df: pd.DataFrame) -> bytes:
+    """
+    将表格导出为带BOM的UTF-8 CSV字节，直接写入字节缓冲区避免中间字符串
+    
+    Args:
+        table_key: 表格数据的JSON文本，作为缓存键（单元格可能含列表、字典等无法按内容哈希的值）
+        _df: 表格DataFrame（不参与缓存键计算）
+        
+    Returns:
+        CSV字节
+    """
+    buf = io.BytesIO()
+    _df.to_csv(buf, index=False, encoding='utf-8-sig')
+    return buf.getvalue()
+
 
 class DataVisualizer:
     """数据可视化类"""
     
+    # 响应字段与渲染方法的对应关系，字典顺序即渲染优先级
+    _HANDLERS = {
+        'answer': '_render_text_answer',
+        'table': '_render_table',
+        'bar': '_render_bar_chart',
+        'line': '_render_line_chart',
+        'pie': '_render_pie_chart',
+        'scatter': '_render_scatter_chart',
+    }
+    
     def __init__(self):
         """初始化可视化器"""
-        self.color_palette = [
+        self.color_palette = (
             '#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd',
             '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf'
-        ]
+        )
+        # 预先切好各长度的调色板前缀，渲染时直接取用
+        self._palette_prefix = tuple(
+            self.color_palette[:i] for i in range(len(self.color_palette) + 1)
+        )
+    
+    def _palette_for(self, n: int) -> tuple:
+        """获取前n个颜色组成的调色板"""
+        return self._palette_prefix[min(n, len(self.color_palette))]
     
     def render_response(self, response_data: Dict[str, Any]) -> None:
         """
@@ -31,32 +332,13 @@ class DataVisualizer:
             return
         
         try:
-            # 文字回答
-            if 'answer' in response_data:
-                self._render_text_answer(response_data['answer'])
-            
-            # 表格数据
-            elif 'table' in response_data:
-                self._render_table(response_data['table'])
-            
-            # 柱状图
-            elif 'bar' in response_data:
-                self._render_bar_chart(response_data['bar'])
-            
-            # 折线图
-            elif 'line' in response_data:
-                self._render_line_chart(response_data['line'])
-            
-            # 饼图
-            elif 'pie' in response_data:
-                self._render_pie_chart(response_data['pie'])
-            
-            # 散点图
-            elif 'scatter' in response_data:
-                self._render_scatter_chart(response_data['scatter'])
-            
-            else:
+            # 按优先级找到第一个可渲染的字段
+            key = next((k for k in self._HANDLERS if k in response_data), None)
+            if key is None:
                 st.warning("不支持的响应格式")
+                return
+            
+            getattr(self, self._HANDLERS[key])(response_data[key])
                 
         except Exception as e:
             st.error(f"可视化渲染错误：{str(e)}")
@@ -96,10 +378,9 @@ class DataVisualizer:
             st.dataframe(df, use_container_width=True)
             
             # 提供数据下载
-            csv = df.to_csv(index=False, encoding='utf-8-sig')
             st.download_button(
                 label="下载表格数据",
-                data=csv.encode('utf-8-sig'),
+                data=_df_to_csv_bytes(json.dumps([columns, data], ensure_ascii=False, default=str), df),
                 file_name="table_data.csv",
                 mime="text/csv"
             )
@@ -107,12 +388,13 @@ class DataVisualizer:
         except Exception as e:
             st.error(f"表格渲染错误：{str(e)}")
     
-    def _render_bar_chart(self, chart_data: Dict[str, Any]) -> None:
+    def _render_bar_chart(self, chart_data: Dict[str, Any], detailed: bool = False) -> None:
         """
         渲染柱状图
         
         Args:
             chart_data: 图表数据，包含columns和data
+            detailed: 是否使用Plotly绘制带数值标注的图表
         """
         try:
             columns = chart_data.get('columns', [])
@@ -127,47 +409,29 @@ class DataVisualizer:
                 st.error("列名和数据长度不匹配")
                 return
             
-            # 创建柱状图
-            fig = go.Figure(data=[
-                go.Bar(
-                    x=columns,
-                    y=data,
-                    marker_color=self.color_palette[:len(columns)],
-                    text=data,
-                    textposition='outside'
-                )
-            ])
+            summary_df = _build_series_summary(tuple(columns), tuple(data), '类别')
             
-            # 设置图表样式
-            fig.update_layout(
-                title="柱状图分析",
-                xaxis_title="类别",
-                yaxis_title="数值",
-                showlegend=False,
-                height=500,
-                template="plotly_white"
-            )
-            
-            # 显示图表
-            st.plotly_chart(fig, use_container_width=True)
+            # 简单场景使用原生图表，页面无需加载Plotly
+            if not detailed and _is_strictly_increasing(columns):
+                st.bar_chart(summary_df, x='类别', y='数值', height=500)
+            else:
+                fig = _build_bar_fig(columns, data, self._palette_for(len(columns)))
+                st.plotly_chart(fig, use_container_width=True)
             
             # 显示数据摘要
             with st.expander("数据详情"):
-                summary_df = pd.DataFrame({
-                    '类别': columns,
-                    '数值': data
-                })
-                st.dataframe(summary_df, use_container_width=True)
+                st.dataframe(summary_df, use_container_width=True, hide_index=True)
                 
         except Exception as e:
             st.error(f"柱状图渲染错误：{str(e)}")
     
-    def _render_line_chart(self, chart_data: Dict[str, Any]) -> None:
+    def _render_line_chart(self, chart_data: Dict[str, Any], detailed: bool = False) -> None:
         """
         渲染折线图
         
         Args:
             chart_data: 图表数据，包含columns和data
+            detailed: 是否使用Plotly绘制带标记点样式的图表
         """
         try:
             columns = chart_data.get('columns', [])
@@ -182,39 +446,18 @@ class DataVisualizer:
                 st.error("列名和数据长度不匹配")
                 return
             
-            # 创建折线图
-            fig = go.Figure(data=[
-                go.Scatter(
-                    x=columns,
-                    y=data,
-                    mode='lines+markers',
-                    line=dict(color=self.color_palette[0], width=3),
-                    marker=dict(size=8, color=self.color_palette[1]),
-                    text=data,
-                    textposition='top center'
-                )
-            ])
+            summary_df = _build_series_summary(tuple(columns), tuple(data), '时间/类别')
             
-            # 设置图表样式
-            fig.update_layout(
-                title="趋势分析",
-                xaxis_title="时间/类别",
-                yaxis_title="数值",
-                showlegend=False,
-                height=500,
-                template="plotly_white"
-            )
-            
-            # 显示图表
-            st.plotly_chart(fig, use_container_width=True)
+            # 简单场景使用原生图表，页面无需加载Plotly
+            if not detailed and _is_strictly_increasing(columns):
+                st.line_chart(summary_df, x='时间/类别', y='数值', height=500)
+            else:
+                fig = _build_line_fig(columns, data, self._palette_prefix[-1])
+                st.plotly_chart(fig, use_container_width=True)
             
             # 显示数据摘要
             with st.expander("数据详情"):
-                summary_df = pd.DataFrame({
-                    '时间/类别': columns,
-                    '数值': data
-                })
-                st.dataframe(summary_df, use_container_width=True)
+                st.dataframe(summary_df, use_container_width=True, hide_index=True)
                 
         except Exception as e:
             st.error(f"折线图渲染错误：{str(e)}")
@@ -240,33 +483,15 @@ class DataVisualizer:
                 return
             
             # 创建饼图
-            fig = go.Figure(data=[
-                go.Pie(
-                    labels=labels,
-                    values=values,
-                    hole=0.3,  # 创建圆环图效果
-                    marker_colors=self.color_palette[:len(labels)]
-                )
-            ])
-            
-            # 设置图表样式
-            fig.update_layout(
-                title="比例分析",
-                height=500,
-                template="plotly_white"
-            )
+            fig = _build_pie_fig(labels, values, self._palette_for(len(labels)))
             
             # 显示图表
             st.plotly_chart(fig, use_container_width=True)
             
             # 显示数据摘要
             with st.expander("数据详情"):
-                summary_df = pd.DataFrame({
-                    '类别': labels,
-                    '数值': values,
-                    '占比': [f"{v/sum(values)*100:.1f}%" for v in values]
-                })
-                st.dataframe(summary_df, use_container_width=True)
+                summary_df = _build_pie_summary(tuple(labels), tuple(values))
+                st.dataframe(summary_df, use_container_width=True, hide_index=True)
                 
         except Exception as e:
             st.error(f"饼图渲染错误：{str(e)}")
@@ -299,42 +524,15 @@ class DataVisualizer:
                 labels = [f"点{i+1}" for i in range(len(x_data))]
             
             # 创建散点图
-            fig = go.Figure(data=[
-                go.Scatter(
-                    x=x_data,
-                    y=y_data,
-                    mode='markers',
-                    marker=dict(
-                        size=10,
-                        color=self.color_palette[0],
-                        opacity=0.7
-                    ),
-                    text=labels,
-                    textposition='top center'
-                )
-            ])
-            
-            # 设置图表样式
-            fig.update_layout(
-                title="散点分析",
-                xaxis_title="X轴",
-                yaxis_title="Y轴",
-                showlegend=False,
-                height=500,
-                template="plotly_white"
-            )
+            fig = _build_scatter_fig(x_data, y_data, labels, self._palette_prefix[-1])
             
             # 显示图表
             st.plotly_chart(fig, use_container_width=True)
             
             # 显示数据摘要
             with st.expander("数据详情"):
-                summary_df = pd.DataFrame({
-                    '标签': labels,
-                    'X值': x_data,
-                    'Y值': y_data
-                })
-                st.dataframe(summary_df, use_container_width=True)
+                summary_df = _build_scatter_summary(tuple(labels), tuple(x_data), tuple(y_data))
+                st.dataframe(summary_df, use_container_width=True, hide_index=True)
                 
         except Exception as e:
             st.error(f"散点图渲染错误：{str(e)}")
@@ -352,62 +550,72 @@ class DataVisualizer:
         
         st.subheader("数据探索")
         
+        # 每次运行只获取一次数据指纹，供下面各缓存计算作为键
+        data_hash = get_data_hash(df)
+        
+        # 低基数文本列转为分类类型，后续计数直接基于整数编码
+        df = _to_categorical(data_hash, df)
+        
         # 数值列分布图
-        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
+        numeric_cols = _numeric_cols(df)
         if numeric_cols:
             col1, col2 = st.columns(2)
             
             with col1:
-                if len(numeric_cols) > 0:
-                    selected_col = st.selectbox("选择数值列", numeric_cols)
-                    if selected_col:
-                        fig = px.histogram(
-                            df, 
-                            x=selected_col, 
-                            title=f"{selected_col} 分布图",
-                            color_discrete_sequence=self.color_palette
-                        )
-                        fig.update_layout(height=400)
-                        st.plotly_chart(fig, use_container_width=True)
+                self._numeric_hist_fragment(df, data_hash, numeric_cols)
             
             with col2:
                 if len(numeric_cols) >= 2:
-                    col_x = st.selectbox("X轴", numeric_cols, key="x_axis")
-                    col_y = st.selectbox("Y轴", numeric_cols, index=1, key="y_axis")
-                    
-                    if col_x and col_y:
-                        fig = px.scatter(
-                            df, 
-                            x=col_x, 
-                            y=col_y, 
-                            title=f"{col_x} vs {col_y}",
-                            color_discrete_sequence=self.color_palette
-                        )
-                        fig.update_layout(height=400)
-                        st.plotly_chart(fig, use_container_width=True)
+                    self._scatter_fragment(df, data_hash, numeric_cols)
         
         # 分类列统计
-        categorical_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
+        categorical_cols = _categorical_cols(df)
         if categorical_cols:
-            st.subheader("分类数据统计")
-            selected_cat_col = st.selectbox("选择分类列", categorical_cols)
-            
-            if selected_cat_col:
-                value_counts = df[selected_cat_col].value_counts().head(10)
-                
-                fig = px.bar(
-                    x=value_counts.index,
-                    y=value_counts.values,
-                    title=f"{selected_cat_col} 分布",
-                    color_discrete_sequence=self.color_palette
-                )
-                fig.update_layout(
-                    xaxis_title=selected_cat_col,
-                    yaxis_title="数量",
-                    height=400
-                )
-                st.plotly_chart(fig, use_container_width=True)
+            self._categorical_fragment(df, data_hash, categorical_cols)
+    
+    # 以下各图表块均为独立片段：切换下拉框时只重新运行所在片段，不会重绘其他图表
     
+    @st.fragment
+    def _numeric_hist_fragment(self, df: pd.DataFrame, data_hash: str, numeric_cols: List[str]) -> None:
+        """数值列分布图"""
+        selected_col = st.selectbox("选择数值列", numeric_cols)
+        if selected_col:
+            fig = _build_histogram_fig(data_hash, selected_col, self._palette_prefix[-1], df)
+            st.plotly_chart(fig, use_container_width=True)
+    
+    @st.fragment
+    def _scatter_fragment(self, df: pd.DataFrame, data_hash: str, numeric_cols: List[str]) -> None:
+        """两个数值列的散点图"""
+        col_x = st.selectbox("X轴", numeric_cols, key="x_axis")
+        col_y = st.selectbox("Y轴", numeric_cols, index=1, key="y_axis")
+        
+        if col_x and col_y:
+            fig = _build_pair_scatter_fig(data_hash, col_x, col_y, self._palette_prefix[-1], df)
+            st.plotly_chart(fig, use_container_width=True)
+    
+    @st.fragment
+    def _categorical_fragment(self, df: pd.DataFrame, data_hash: str, categorical_cols: List[str]) -> None:
+        """分类列统计"""
+        st.subheader("分类数据统计")
+        selected_cat_col = st.selectbox("选择分类列", categorical_cols)
+        
+        if selected_cat_col:
+            value_counts = _value_counts_top(data_hash, selected_cat_col, df)
+            
+            fig = px.bar(
+                x=value_counts.index,
+                y=value_counts.values,
+                title=f"{selected_cat_col} 分布",
+                color_discrete_sequence=self._palette_prefix[-1]
+            )
+            fig.update_layout(
+                xaxis_title=selected_cat_col,
+                yaxis_title="数量",
+                height=400
+            )
+            st.plotly_chart(fig, use_container_width=True)
+    
+    @st.fragment
     def create_correlation_heatmap(self, df: pd.DataFrame) -> None:
         """
         创建相关性热力图
@@ -415,14 +623,12 @@ class DataVisualizer:
         Args:
             df: DataFrame数据
         """
-        numeric_df = df.select_dtypes(include=['number'])
-        
-        if len(numeric_df.columns) < 2:
+        if len(_numeric_cols(df)) < 2:
             st.info("需要至少2个数值列才能生成相关性分析")
             return
         
         # 计算相关性矩阵
-        corr_matrix = numeric_df.corr()
+        corr_matrix = _corr_matrix(get_data_hash(df), df)
         
         # 创建热力图
         fig = px.imshow(
@@ -433,4 +639,10 @@ class DataVisualizer:
             color_continuous_scale="RdBu_r"
         )
         fig.update_layout(height=500)
-        st.plotly_chart(fig, use_container_width=True) 
\ No newline at end of file
+        st.plotly_chart(fig, use_container_width=True)
+
+
+@st.cache_resource
+def get_visualizer() -> DataVisualizer:
+    """获取可视化器单例，所有会话与重新运行共享同一实例"""
+    return DataVisualizer()